@@ -3,8 +3,12 @@
 
 import os
 import json
+import time
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -12,6 +16,26 @@ logger.setLevel(logging.INFO)
 users_service_base_url = os.environ.get('users_service_base_url')
 recommendations_service_base_url = os.environ.get('recommendations_service_base_url')
 
+# Users are cached in the warm container for up to this many seconds
+USER_CACHE_TTL_SECONDS = 60
+
+# Timeout (seconds) for calls to the users and recommendations services
+SERVICE_TIMEOUT = 2.0
+
+# Reuse connections to the users and recommendations services across invocations of a warm container
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections = 4, pool_maxsize = 8)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+# Used to fetch recommendations concurrently with the user lookup
+_executor = ThreadPoolExecutor(max_workers = 4)
+
+# Identity ID to user ID mappings seen by this container. These do not change so they
+# outlive the user cache and are used to speculatively fetch recommendations.
+MAX_KNOWN_USER_IDS = 1024
+_known_user_ids = {}
+
 def close(fulfillment_state, message):
     response = {
         'dialogAction': {
@@ -36,53 +60,61 @@ def build_response_card(attachments):
         'genericAttachments': attachments
     }
 
+def _truncate(text, max_length = 80):
+    return text if len(text) <= max_length else text[:max_length - 3] + '...'
+
 def build_response_card_attachment(title, subtitle, image_url, link_url, options = None):
     """
     Build a responseCard attachment with a title, subtitle, and an optional set of options which should be displayed as buttons.
     """
-    buttons = None
-    if options is not None:
-        buttons = []
-        for i in range(min(5, len(options))):
-            buttons.append(options[i])
-
-    if len(title) > 80:
-        title = title[:77] + '...'
-
-    if len(subtitle) > 80:
-        subtitle = subtitle[:77] + '...'
-
     return {
-        'title': title,
-        'subTitle': subtitle,
+        'title': _truncate(title),
+        'subTitle': _truncate(subtitle),
         'imageUrl': image_url,
         'attachmentLinkUrl': link_url,
-        'buttons': buttons
+        'buttons': options[:5] if options is not None else None
     }
 
-def lookup_user(identity_id):
-    logger.debug('Looking up user for identityId ' + identity_id)
+@lru_cache(maxsize = 512)
+def _lookup_user_cached(identity_id, ttl_bucket):
+    """
+    Lookup the user for an identity ID. The ttl_bucket argument changes every USER_CACHE_TTL_SECONDS so cached
+    entries expire. Raises LookupError when the user is not found so that misses are not cached.
+    """
+    logger.debug('Looking up user for identityId %s', identity_id)
 
     url = f'{users_service_base_url}/users/identityid/{identity_id}'
-    response = requests.get(url)
-
-    user = None
+    response = _session.get(url, timeout = SERVICE_TIMEOUT)
 
     if response.ok:
         user_check = response.json()
         if user_check.get('id') and len(user_check.get('id')) > 0:
-            user = user_check
-            logger.debug('Found user: ' + json.dumps(user, indent = 2))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Found user: ' + json.dumps(user_check, indent = 2))
+            return user_check
         else:
             logger.warn('User not found for identityId ' + identity_id)
 
+    raise LookupError(identity_id)
+
+def lookup_user(identity_id):
+    try:
+        user = _lookup_user_cached(identity_id, int(time.time() // USER_CACHE_TTL_SECONDS))
+    except LookupError:
+        return None
+
+    if identity_id not in _known_user_ids:
+        if len(_known_user_ids) >= MAX_KNOWN_USER_IDS:
+            _known_user_ids.clear()
+        _known_user_ids[identity_id] = user['id']
+
     return user
 
 def get_recommendations(user_id, max_items = 10):
-    logger.debug('Looking up product recommendations for user ' + user_id)
+    logger.debug('Looking up product recommendations for user %s', user_id)
 
     url = f'{recommendations_service_base_url}/recommendations?userID={user_id}&fullyQualifyImageUrls=1&numResults={max_items}'
-    response = requests.get(url)
+    response = _session.get(url, timeout = SERVICE_TIMEOUT)
 
     recommendations = None
 
@@ -96,17 +128,26 @@ def recommend_products(intent_request):
     # What the chatbot sends as the "userId" is really the identity ID from the auth'd client session.
     identity_id = intent_request['userId']
 
+    # If we have seen this user before, fetch recommendations while the user is looked up.
+    known_user_id = _known_user_ids.get(identity_id)
+    recommendations_future = None
+    if known_user_id:
+        recommendations_future = _executor.submit(get_recommendations, known_user_id, 4)
+
     # Lookup the user based on the identity_id
     store_user = lookup_user(identity_id)
 
     if store_user:
-        recommendations = get_recommendations(store_user['id'], 4)
+        if recommendations_future and store_user['id'] == known_user_id:
+            recommendations = recommendations_future.result()
+        else:
+            recommendations = get_recommendations(store_user['id'], 4)
 
         user_name = store_user['first_name']
         if not user_name:
             user_name = "there"
 
-        if recommendations and len(recommendations) > 0:
+        if recommendations:
             attachments = []
 
             for recommendation in recommendations:
@@ -137,7 +178,7 @@ def dispatch(intent_request):
     """
     Called when the user specifies an intent for this bot.
     """
-    logger.debug('dispatch userId={}, intentName={}'.format(intent_request['userId'], intent_request['currentIntent']['name']))
+    logger.debug('dispatch userId=%s, intentName=%s', intent_request['userId'], intent_request['currentIntent']['name'])
 
     intent_name = intent_request['currentIntent']['name']
 
@@ -154,9 +195,11 @@ def lambda_handler(event, context):
     Route the incoming request based on intent.
     The JSON body of the request is provided in the event slot.
     """
-    logger.debug(os.environ)
-    logger.debug(json.dumps(event, indent = 2))
-    logger.debug('event.bot.name={}'.format(event['bot']['name']))
+    # Only pay for serializing the environment and event when debug logging is enabled
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(os.environ)
+        logger.debug(json.dumps(event, indent = 2))
+        logger.debug('event.bot.name=%s', event['bot']['name'])
 
     if not users_service_base_url:
         raise ValueError("Missing required environment value for 'users_service_base_url'")
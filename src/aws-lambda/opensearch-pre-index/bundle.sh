@@ -9,7 +9,10 @@ echo "Cleaning up intermediate files"
 [ -e "package" ] && rm -rf package
 
 echo "Installing Lambda dependencies"
-pip install -r requirements.txt --target ./package
+# orjson and PyYAML's libyaml bindings are native extensions so install the builds for the
+# function's runtime (python3.9 on x86_64) rather than for the machine running this script
+pip install -r <(grep -i -E '^(orjson|pyyaml)' requirements.txt) --target ./package --platform manylinux2014_x86_64 --python-version 3.9 --implementation cp --only-binary=:all:
+pip install -r <(grep -v -i -E '^(orjson|pyyaml)' requirements.txt) --target ./package
 
 echo "Building Lambda deployment package"
 cd package
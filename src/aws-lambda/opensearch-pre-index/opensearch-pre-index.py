@@ -8,6 +8,14 @@ import logging
 import boto3
 from crhelper import CfnResource
 from opensearchpy import OpenSearch
+from opensearchpy.helpers import streaming_bulk
+from opensearchpy.serializer import JSONSerializer
+
+# Prefer the libyaml based loader, which is much faster than the pure Python loader
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -20,7 +28,63 @@ INDEX_NAME = 'products'
 TYPE_NAME = 'product'
 ID_FIELD = 'id'
 
-MAX_BULK_BATCH_SIZE = 100
+# Bulk requests are batched by size; AWS recommends 5-15 MB per bulk request. The document
+# limit is only a backstop so that MAX_BULK_BATCH_BYTES is what normally closes a batch.
+MAX_BULK_BATCH_BYTES = 5 * 1024 * 1024
+MAX_BULK_BATCH_DOCS = 50000
+
+# Bulk bodies are serialized with orjson when it can be imported
+try:
+    import orjson
+
+    class OrjsonSerializer(JSONSerializer):
+        """ Serializes request bodies (including each bulk action and document) with orjson """
+        def dumps(self, data):
+            if isinstance(data, (str, bytes)):
+                return data
+            return orjson.dumps(data).decode('utf-8')
+
+    BodySerializer = OrjsonSerializer
+except ImportError:
+    BodySerializer = JSONSerializer
+
+# OpenSearch clients by domain endpoint, reused across invocations of a warm container
+_search_clients = {}
+
+def get_search_client(search_domain_endpoint):
+    search = _search_clients.get(search_domain_endpoint)
+    if search is None:
+        search_host = {
+            'host' : search_domain_endpoint,
+            'port' : 443,
+            'scheme' : 'https',
+        }
+        search = OpenSearch(hosts = [search_host], timeout=30, max_retries=10, retry_on_timeout=True, serializer=BodySerializer())
+        _search_clients[search_domain_endpoint] = search
+
+    return search
+
+def bulk_index_products(search, products_list):
+    """ Indexes products and returns the number indexed and the number that failed """
+    # streaming_bulk consumes the actions lazily and takes care of batching by
+    # document count and size as well as retrying throttled requests.
+    actions = ({
+        "_index": INDEX_NAME,
+        "_type": TYPE_NAME,
+        "_id": product[ID_FIELD],
+        "_source": product
+    } for product in products_list)
+
+    indexed = failed = 0
+    for ok, info in streaming_bulk(search, actions, chunk_size = MAX_BULK_BATCH_DOCS, max_chunk_bytes = MAX_BULK_BATCH_BYTES,
+                                   max_retries = 3, raise_on_error = False):
+        if ok:
+            indexed += 1
+        else:
+            failed += 1
+            logger.error('Failed to index product: %s', info)
+
+    return indexed, failed
 
 def index_products(event):
     # Conditionally creates and loads OpenSearch products index
@@ -31,16 +95,10 @@ def index_products(event):
     search_domain_endpoint = event['ResourceProperties']['OpenSearchDomainEndpoint']
     logger.info('OpenSearch endpoint: %s', search_domain_endpoint)
 
-    search_host = {
-        'host' : search_domain_endpoint,
-        'port' : 443,
-        'scheme' : 'https',
-    }
-
     # For testing: specify 'ForceIndex' to force existing index to be deleted and products indexed.
     force_index = event['ResourceProperties'].get('ForceIndex', 'no').lower() in [ 'true', 'yes', '1' ]
 
-    search = OpenSearch(hosts = [search_host], timeout=30, max_retries=10, retry_on_timeout=True)
+    search = get_search_client(search_domain_endpoint)
 
     create_index_and_bulk_load = True
 
@@ -67,35 +125,18 @@ def index_products(event):
         res = search.indices.create(index = INDEX_NAME, body = request_body)
         logger.debug("Create index response: %s", res)
 
-        logger.info('Downloading products.yaml...')
-        s3.meta.client.download_file(event['ResourceProperties']['Bucket'], event['ResourceProperties']['File'], '/tmp/products.yaml')
-        with open('/tmp/products.yaml') as file:
-            logger.info('Loading products.yaml...')
-            products_list = yaml.safe_load(file)
-
-            logger.info('Bulk indexing %s products in %s batches...', len(products_list), int(len(products_list)/MAX_BULK_BATCH_SIZE))
-            bulk_data = []
-
-            for product in products_list:
-                bulk_data.append({
-                    "index": {
-                        "_index": INDEX_NAME,
-                        "_type": TYPE_NAME,
-                        "_id": product[ID_FIELD]
-                    }
-                })
-                bulk_data.append(product)
-
-                if len(bulk_data) >= MAX_BULK_BATCH_SIZE:
-                    logger.debug("Indexing batch")
-                    search.bulk(index = INDEX_NAME, body = bulk_data)
-                    bulk_data = []
-
-            if len(bulk_data) > 0:
-                logger.debug("Indexing last batch")
-                search.bulk(index = INDEX_NAME, body = bulk_data)
-
-        logger.info('Products successfully indexed!')
+        # Parse products.yaml directly from the S3 object stream rather than downloading it to /tmp first
+        logger.info('Loading products.yaml...')
+        response = s3.meta.client.get_object(Bucket = event['ResourceProperties']['Bucket'], Key = event['ResourceProperties']['File'])
+        products_list = yaml.load(response['Body'], Loader = SafeLoader)
+
+        logger.info('Bulk indexing %s products...', len(products_list))
+        indexed, failed = bulk_index_products(search, products_list)
+
+        if failed:
+            raise Exception(f'Failed to index {failed} of {indexed + failed} products')
+
+        logger.info('%s products successfully indexed!', indexed)
 
 @helper.create
 def opensearch_create(event,_):
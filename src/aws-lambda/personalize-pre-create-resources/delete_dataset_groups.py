@@ -14,6 +14,12 @@ Deletes one or more Amazon Personalize dataset groups, including all of their as
 - Schemas (associated with datasets)
 - Dataset Group
 
+Amazon Personalize does not publish resource state change events (i.e., to EventBridge)
+when resources are deleted, so completion is detected by polling the Personalize list APIs.
+When wait_for_resources is False, no polling loop is run in-process; ResourcePending is
+raised instead and the caller is expected to call again later. The personalize-pre-create-resources
+Lambda does this from an EventBridge scheduled rule so it is not billed while deletes complete.
+
 Command line arguments:
 
 -n/--name= - comma delimited list of dataset group names (required)
@@ -34,17 +40,146 @@ import logging
 import botocore
 import boto3
 import time
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set, Tuple
 from packaging import version
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger()
-personalize = None
+
+# Max number of concurrent list calls issued per polling round
+MAX_LIST_WORKERS = 16
+
+# Paginated list operation, result key, and ARN key for each resource type that is polled
+LIST_OPERATIONS = {
+    'recommender': ('list_recommenders', 'recommenders', 'recommenderArn'),
+    'campaign': ('list_campaigns', 'campaigns', 'campaignArn'),
+    'solution': ('list_solutions', 'solutions', 'solutionArn'),
+    'event tracker': ('list_event_trackers', 'eventTrackers', 'eventTrackerArn'),
+    'filter': ('list_filters', 'Filters', 'filterArn'),
+    'dataset': ('list_datasets', 'datasets', 'datasetArn')
+}
+
+def _personalize_client_config() -> Config:
+    """ Keeps connections alive between the many API calls made while polling and sizes
+    the connection pool so that concurrent calls are not serialized on it.
+
+    Built on first use rather than at import since tcp_keepalive is not accepted by
+    botocore versions older than the minimum checked in delete_dataset_groups.
+    """
+    return Config(
+        tcp_keepalive = True,
+        max_pool_connections = 32,
+        retries = {
+            'mode': 'adaptive',
+            'max_attempts': 10
+        }
+    )
+
+# Personalize clients are created lazily and cached at module level by region and worker
+# (the position of the dataset group in the list being deleted). Each dataset group worker
+# gets its own session and client while warm Lambda invocations, whose worker threads
+# are new every call, still reuse the clients created by earlier invocations.
+_clients: Dict[Tuple[str, int], object] = {}
+_clients_lock = threading.Lock()
 
 class ResourcePending(Exception):
     pass
 
-def _get_dataset_group_arn(dataset_group_name: str) -> str:
+def _get_personalize(region: str = None, worker: int = 0):
+    key = (region, worker)
+    with _clients_lock:
+        personalize = _clients.get(key)
+
+    if personalize is None:
+        # boto3's default session is not thread safe, so each client gets its own session
+        personalize = boto3.session.Session().client(service_name = 'personalize', region_name = region, config = _personalize_client_config())
+        with _clients_lock:
+            personalize = _clients.setdefault(key, personalize)
+
+    return personalize
+
+def _list_arns(personalize, resource_name: str, list_params: Dict) -> Set[str]:
+    """ Returns the ARNs of all resources of a type currently listed for the given filter """
+    operation_name, result_key, arn_key = LIST_OPERATIONS[resource_name]
+
+    arns = set()
+    paginator = personalize.get_paginator(operation_name)
+    for page in paginator.paginate(**list_params):
+        for resource in page[result_key]:
+            arns.add(resource[arn_key])
+
+    return arns
+
+def _remaining_arns(personalize, resource_name: str, arns: Set[str], list_params: List[Dict]) -> Set[str]:
+    """ Returns the ARNs that still exist, determined by listing resources rather than describing each ARN
+
+    Each entry in list_params is a separate list filter (i.e., one per solution for campaigns);
+    multiple filters are listed concurrently.
+    """
+    if not arns or not list_params:
+        return set()
+
+    listed_arns = set()
+    if len(list_params) == 1:
+        listed_arns = _list_arns(personalize, resource_name, list_params[0])
+    else:
+        with ThreadPoolExecutor(max_workers = min(MAX_LIST_WORKERS, len(list_params))) as executor:
+            for arns_for_params in executor.map(lambda params: _list_arns(personalize, resource_name, params), list_params):
+                listed_arns |= arns_for_params
+
+    return arns & listed_arns
+
+def _poll_delay(attempt: int, fast_rounds: int = 0) -> float:
+    """ Seconds to sleep before the next polling round, backing off exponentially up to 30 seconds """
+    if attempt < fast_rounds:
+        return 1
+    return min(30, 2 * 1.7**(attempt - fast_rounds))
+
+def _wait_until_deleted(personalize, pending: Dict[str, Tuple[Set[str], List[Dict]]], wait_for_resources: bool = True, fast_rounds: int = 0):
+    """ Polls until every resource has been deleted, raising ResourcePending if any remain
+
+    The pending dict maps a resource name (key in LIST_OPERATIONS) to the ARNs being deleted
+    and the list filters used to check for them. All resource types are checked concurrently
+    in each polling round so independent deletes are waited on together.
+
+    Personalize does not provide boto3 waiters for resource deletion so this polls with
+    an exponential backoff. Resources that typically delete quickly can be checked every
+    second for the first few rounds by specifying fast_rounds.
+    """
+    def remaining(item):
+        resource_name, (arns, list_params) = item
+        return resource_name, _remaining_arns(personalize, resource_name, arns, list_params), list_params
+
+    attempt = 0
+    max_time = time.time() + 30*60 # 30 mins
+    while time.time() < max_time:
+        with ThreadPoolExecutor(max_workers = max(1, len(pending))) as executor:
+            results = list(executor.map(remaining, pending.items()))
+
+        pending = {}
+        for resource_name, arns, list_params in results:
+            if len(arns) == 0:
+                logger.info('All {}s have been deleted or none exist for dataset group'.format(resource_name))
+            else:
+                pending[resource_name] = (arns, list_params)
+
+        if len(pending) == 0:
+            return
+
+        still_deleting = ', '.join('{} {}(s)'.format(len(arns), resource_name) for resource_name, (arns, _) in pending.items())
+        if wait_for_resources:
+            logger.info('Waiting for {} to be deleted'.format(still_deleting))
+            time.sleep(_poll_delay(attempt, fast_rounds))
+            attempt += 1
+        else:
+            raise ResourcePending(f'There are {still_deleting} still being deleted')
+
+    raise ResourcePending('Timed out waiting for all {} to be deleted'.format(', '.join(f'{resource_name}s' for resource_name in pending)))
+
+def _get_dataset_group_arn(personalize, dataset_group_name: str) -> str:
     dsg_arn = None
 
     paginator = personalize.get_paginator('list_dataset_groups')
@@ -59,7 +194,7 @@ def _get_dataset_group_arn(dataset_group_name: str) -> str:
 
     return dsg_arn
 
-def _get_solutions(dataset_group_arn: str) -> List[str]:
+def _get_solutions(personalize, dataset_group_arn: str) -> List[str]:
     solution_arns = []
 
     paginator = personalize.get_paginator('list_solutions')
@@ -69,8 +204,8 @@ def _get_solutions(dataset_group_arn: str) -> List[str]:
 
     return solution_arns
 
-def _delete_recommenders_and_campaigns(dataset_group_arn: str, solution_arns: List[str], wait_for_resources: bool = True):
-    recommender_arns = []
+def _delete_recommenders(personalize, dataset_group_arn: str) -> Set[str]:
+    recommender_arns = set()
 
     paginator = personalize.get_paginator('list_recommenders')
     for recommender_page in paginator.paginate(datasetGroupArn = dataset_group_arn):
@@ -83,9 +218,12 @@ def _delete_recommenders_and_campaigns(dataset_group_arn: str, solution_arns: Li
             else:
                 raise Exception('Recommender {} has a status of {} so cannot be deleted'.format(recommender['recommenderArn'], recommender['status']))
 
-            recommender_arns.append(recommender['recommenderArn'])
+            recommender_arns.add(recommender['recommenderArn'])
+
+    return recommender_arns
 
-    campaign_arns = []
+def _delete_campaigns(personalize, solution_arns: List[str]) -> Set[str]:
+    campaign_arns = set()
 
     for solution_arn in solution_arns:
         paginator = personalize.get_paginator('list_campaigns')
@@ -100,55 +238,11 @@ def _delete_recommenders_and_campaigns(dataset_group_arn: str, solution_arns: Li
                 else:
                     raise Exception('Campaign {} has a status of {} so cannot be deleted'.format(campaign['campaignArn'], campaign['status']))
 
-                campaign_arns.append(campaign['campaignArn'])
+                campaign_arns.add(campaign['campaignArn'])
 
-    max_time = time.time() + 30*60 # 30 mins
-    while time.time() < max_time:
-        for recommender_arn in recommender_arns:
-            try:
-                describe_response = personalize.describe_recommender(recommenderArn = recommender_arn)
-                logger.debug('Recommender {} status is {}'.format(recommender_arn, describe_response['recommender']['status']))
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ResourceNotFoundException':
-                    recommender_arns.remove(recommender_arn)
-
-        if len(recommender_arns) == 0:
-            logger.info('All recommenders have been deleted or none exist for dataset group')
-            break
-        elif wait_for_resources:
-            logger.info('Waiting for {} recommender(s) to be deleted'.format(len(recommender_arns)))
-            time.sleep(20)
-        else:
-            raise ResourcePending(f'There are {len(recommender_arns)} recommender(s) still being deleted')
+    return campaign_arns
 
-    if len(recommender_arns) > 0:
-        raise ResourcePending('Timed out waiting for all recommenders to be deleted')
-
-    max_time = time.time() + 30*60 # 30 mins
-    while time.time() < max_time:
-        for campaign_arn in campaign_arns:
-            try:
-                describe_response = personalize.describe_campaign(campaignArn = campaign_arn)
-                logger.debug('Campaign {} status is {}'.format(campaign_arn, describe_response['campaign']['status']))
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ResourceNotFoundException':
-                    campaign_arns.remove(campaign_arn)
-
-        if len(campaign_arns) == 0:
-            logger.info('All campaigns have been deleted or none exist for dataset group')
-            break
-        elif wait_for_resources:
-            logger.info('Waiting for {} campaign(s) to be deleted'.format(len(campaign_arns)))
-            time.sleep(20)
-        else:
-            raise ResourcePending(f'There are {len(campaign_arns)} campaign(s) still being deleted')
-
-    if len(campaign_arns) > 0:
-        raise ResourcePending('Timed out waiting for all campaigns to be deleted')
-
-def _delete_solutions(solution_arns: List[str], wait_for_resources: bool = True):
+def _delete_solutions(personalize, solution_arns: List[str]) -> Set[str]:
     for solution_arn in solution_arns:
         try:
             describe_response = personalize.describe_solution(solutionArn = solution_arn)
@@ -166,31 +260,10 @@ def _delete_solutions(solution_arns: List[str], wait_for_resources: bool = True)
             if error_code != 'ResourceNotFoundException':
                 raise e
 
-    max_time = time.time() + 30*60 # 30 mins
-    while time.time() < max_time:
-        for solution_arn in solution_arns:
-            try:
-                describe_response = personalize.describe_solution(solutionArn = solution_arn)
-                logger.debug('Solution {} status is {}'.format(solution_arn, describe_response['solution']['status']))
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ResourceNotFoundException':
-                    solution_arns.remove(solution_arn)
-
-        if len(solution_arns) == 0:
-            logger.info('All solutions have been deleted or none exist for dataset group')
-            break
-        elif wait_for_resources:
-            logger.info('Waiting for {} solution(s) to be deleted'.format(len(solution_arns)))
-            time.sleep(20)
-        else:
-            raise ResourcePending(f'There are {len(solution_arns)} solution(s) still being deleted')
+    return set(solution_arns)
 
-    if len(solution_arns) > 0:
-        raise ResourcePending('Timed out waiting for all solutions to be deleted')
-
-def _delete_event_trackers(dataset_group_arn: str, wait_for_resources: bool = True):
-    event_tracker_arns = []
+def _delete_event_trackers(personalize, dataset_group_arn: str) -> Set[str]:
+    event_tracker_arns = set()
 
     event_trackers_paginator = personalize.get_paginator('list_event_trackers')
     for event_tracker_page in event_trackers_paginator.paginate(datasetGroupArn = dataset_group_arn):
@@ -203,72 +276,31 @@ def _delete_event_trackers(dataset_group_arn: str, wait_for_resources: bool = Tr
             else:
                 raise Exception('Solution {} has a status of {} so cannot be deleted'.format(event_tracker['eventTrackerArn'], event_tracker['status']))
 
-            event_tracker_arns.append(event_tracker['eventTrackerArn'])
+            event_tracker_arns.add(event_tracker['eventTrackerArn'])
 
-    max_time = time.time() + 30*60 # 30 mins
-    while time.time() < max_time:
-        for event_tracker_arn in event_tracker_arns:
-            try:
-                describe_response = personalize.describe_event_tracker(eventTrackerArn = event_tracker_arn)
-                logger.debug('Event tracker {} status is {}'.format(event_tracker_arn, describe_response['eventTracker']['status']))
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ResourceNotFoundException':
-                    event_tracker_arns.remove(event_tracker_arn)
-
-        if len(event_tracker_arns) == 0:
-            logger.info('All event trackers have been deleted or none exist for dataset group')
-            break
-        elif wait_for_resources:
-            logger.info('Waiting for {} event tracker(s) to be deleted'.format(len(event_tracker_arns)))
-            time.sleep(20)
-        else:
-            raise ResourcePending(f'There are {len(event_tracker_arns)} event tracker(s) still being deleted')
+    return event_tracker_arns
 
-    if len(event_tracker_arns) > 0:
-        raise ResourcePending('Timed out waiting for all event trackers to be deleted')
-
-def _delete_filters(dataset_group_arn: str, wait_for_resources: bool = True):
-    filter_arns = []
+def _delete_filters(personalize, dataset_group_arn: str) -> Set[str]:
+    filter_arns = set()
 
     filters_response = personalize.list_filters(datasetGroupArn = dataset_group_arn, maxResults = 100)
     for filter in filters_response['Filters']:
         logger.info('Deleting filter ' + filter['filterArn'])
         personalize.delete_filter(filterArn = filter['filterArn'])
-        filter_arns.append(filter['filterArn'])
-
-    max_time = time.time() + 30*60 # 30 mins
-    while time.time() < max_time:
-        for filter_arn in filter_arns:
-            try:
-                describe_response = personalize.describe_filter(filterArn = filter_arn)
-                logger.debug('Filter {} status is {}'.format(filter_arn, describe_response['filter']['status']))
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ResourceNotFoundException':
-                    filter_arns.remove(filter_arn)
-
-        if len(filter_arns) == 0:
-            logger.info('All filters have been deleted or none exist for dataset group')
-            break
-        elif wait_for_resources:
-            logger.info('Waiting for {} filter(s) to be deleted'.format(len(filter_arns)))
-            time.sleep(20)
-        else:
-            raise ResourcePending(f'There are {len(filter_arns)} filter(s) still being deleted')
+        filter_arns.add(filter['filterArn'])
 
-    if len(filter_arns) > 0:
-        raise ResourcePending('Timed out waiting for all filter to be deleted')
+    return filter_arns
 
-def _delete_datasets_and_schemas(dataset_group_arn: str, wait_for_resources: bool = True):
-    dataset_arns = []
-    schema_arns = []
+def _delete_datasets(personalize, dataset_group_arn: str) -> Tuple[Set[str], Set[str]]:
+    dataset_arns = set()
+    # Datasets can share a schema so a set ensures each schema is only deleted once
+    schema_arns = set()
 
     dataset_paginator = personalize.get_paginator('list_datasets')
     for dataset_page in dataset_paginator.paginate(datasetGroupArn = dataset_group_arn):
         for dataset in dataset_page['datasets']:
             describe_response = personalize.describe_dataset(datasetArn = dataset['datasetArn'])
-            schema_arns.append(describe_response['dataset']['schemaArn'])
+            schema_arns.add(describe_response['dataset']['schemaArn'])
 
             if dataset['status'] in ['ACTIVE', 'CREATE FAILED']:
                 logger.info('Deleting dataset ' + dataset['datasetArn'])
@@ -278,31 +310,11 @@ def _delete_datasets_and_schemas(dataset_group_arn: str, wait_for_resources: boo
             else:
                 raise Exception('Dataset {} has a status of {} so cannot be deleted'.format(dataset['datasetArn'], dataset['status']))
 
-            dataset_arns.append(dataset['datasetArn'])
+            dataset_arns.add(dataset['datasetArn'])
 
-    max_time = time.time() + 30*60 # 30 mins
-    while time.time() < max_time:
-        for dataset_arn in dataset_arns:
-            try:
-                describe_response = personalize.describe_dataset(datasetArn = dataset_arn)
-                logger.debug('Dataset {} status is {}'.format(dataset_arn, describe_response['dataset']['status']))
-            except ClientError as e:
-                error_code = e.response['Error']['Code']
-                if error_code == 'ResourceNotFoundException':
-                    dataset_arns.remove(dataset_arn)
-
-        if len(dataset_arns) == 0:
-            logger.info('All datasets have been deleted or none exist for dataset group')
-            break
-        elif wait_for_resources:
-            logger.info('Waiting for {} dataset(s) to be deleted'.format(len(dataset_arns)))
-            time.sleep(20)
-        else:
-            raise ResourcePending(f'There are {len(dataset_arns)} dataset(s) still being deleted')
-
-    if len(dataset_arns) > 0:
-        raise ResourcePending('Timed out waiting for all datasets to be deleted')
+    return dataset_arns, schema_arns
 
+def _delete_schemas(personalize, schema_arns: Set[str]):
     for schema_arn in schema_arns:
         try:
             logger.info('Deleting schema ' + schema_arn)
@@ -316,10 +328,11 @@ def _delete_datasets_and_schemas(dataset_group_arn: str, wait_for_resources: boo
 
     logger.info('All schemas used exclusively by datasets have been deleted or none exist for dataset group')
 
-def _delete_dataset_group(dataset_group_arn: str, wait_for_resources: bool = True):
+def _delete_dataset_group(personalize, dataset_group_arn: str, wait_for_resources: bool = True):
     logger.info('Deleting dataset group ' + dataset_group_arn)
     personalize.delete_dataset_group(datasetGroupArn = dataset_group_arn)
 
+    attempt = 0
     max_time = time.time() + 30*60 # 30 mins
     while time.time() < max_time:
         try:
@@ -335,47 +348,85 @@ def _delete_dataset_group(dataset_group_arn: str, wait_for_resources: bool = Tru
 
         if wait_for_resources:
             logger.info('Waiting for dataset group to be deleted')
-            time.sleep(20)
+            time.sleep(_poll_delay(attempt))
+            attempt += 1
         else:
             raise ResourcePending(f'Dataset group still being deleted')
 
-def delete_dataset_groups(dataset_group_names: List[str], region: str = None, wait_for_resources: bool = True):
-    min_botocore_version = '1.23.15' # As of re:Invent 2021 when domain recommenders were added to the API
-    if version.parse(botocore.__version__) < version.parse(min_botocore_version):
-        raise Exception(f'Current botocore version {botocore.__version__} does not meet minimum required version of {min_botocore_version}; please upgrade boto3/botocore and try again')
+def _delete_dataset_group_and_resources(dataset_group_name: str, region: str = None, wait_for_resources: bool = True, worker: int = 0):
+    # Each dataset group is deleted by its own worker so give it a dedicated client.
+    personalize = _get_personalize(region, worker)
 
-    global personalize
-    personalize = boto3.client(service_name = 'personalize', region_name = region)
+    dataset_group_arn = _get_dataset_group_arn(personalize, dataset_group_name)
+    if not dataset_group_arn:
+        logger.warning('Dataset Group "%s" does not exist; verify region is correct', dataset_group_name)
+        return
 
-    for dataset_group_name in dataset_group_names:
-        dataset_group_arn = _get_dataset_group_arn(dataset_group_name)
-        if not dataset_group_arn:
-            logger.warning('Dataset Group "%s" does not exist; verify region is correct', dataset_group_name)
-            continue
+    logger.info('Dataset Group ARN: %s', dataset_group_arn)
 
-        logger.info('Dataset Group ARN: %s', dataset_group_arn)
+    solution_arns = _get_solutions(personalize, dataset_group_arn)
+    dataset_group_filter = [{ 'datasetGroupArn': dataset_group_arn }]
 
-        solution_arns = _get_solutions(dataset_group_arn)
+    # 1. Delete recommenders, campaigns, event trackers, and filters. These do not depend
+    # on each other so all deletes are issued up front and then waited on together.
+    _wait_until_deleted(personalize, {
+        'recommender': (_delete_recommenders(personalize, dataset_group_arn), dataset_group_filter),
+        'campaign': (_delete_campaigns(personalize, solution_arns), [{ 'solutionArn': solution_arn } for solution_arn in solution_arns]),
+        'event tracker': (_delete_event_trackers(personalize, dataset_group_arn), dataset_group_filter),
+        'filter': (_delete_filters(personalize, dataset_group_arn), dataset_group_filter)
+    }, wait_for_resources, fast_rounds = 3)
 
-        # 1. Delete recommenders and campaigns
-        _delete_recommenders_and_campaigns(dataset_group_arn = dataset_group_arn, solution_arns = solution_arns, wait_for_resources = wait_for_resources)
+    # 2. Delete solutions (once their campaigns are gone) and datasets
+    solution_arns_deleting = _delete_solutions(personalize, solution_arns)
+    dataset_arns, schema_arns = _delete_datasets(personalize, dataset_group_arn)
+    _wait_until_deleted(personalize, {
+        'solution': (solution_arns_deleting, dataset_group_filter),
+        'dataset': (dataset_arns, dataset_group_filter)
+    }, wait_for_resources)
 
-        # 2. Delete solutions
-        _delete_solutions(solution_arns = solution_arns, wait_for_resources = wait_for_resources)
+    # 3. Delete schemas used by the datasets
+    _delete_schemas(personalize, schema_arns)
 
-        # 3. Delete event trackers
-        _delete_event_trackers(dataset_group_arn = dataset_group_arn, wait_for_resources = wait_for_resources)
+    # 4. Delete dataset group
+    _delete_dataset_group(personalize, dataset_group_arn = dataset_group_arn, wait_for_resources = wait_for_resources)
 
-        # 4. Delete filters
-        _delete_filters(dataset_group_arn = dataset_group_arn, wait_for_resources = wait_for_resources)
+    logger.info(f'Dataset group {dataset_group_name} fully deleted')
 
-        # 5. Delete datasets and their schemas
-        _delete_datasets_and_schemas(dataset_group_arn = dataset_group_arn, wait_for_resources = wait_for_resources)
+def delete_dataset_groups(dataset_group_names: List[str], region: str = None, wait_for_resources: bool = True):
+    min_botocore_version = '1.27.0' # Domain recommenders were added in 1.23.15; tcp_keepalive client config in 1.27.0
+    if version.parse(botocore.__version__) < version.parse(min_botocore_version):
+        raise Exception(f'Current botocore version {botocore.__version__} does not meet minimum required version of {min_botocore_version}; please upgrade boto3/botocore and try again')
 
-        # 6. Delete dataset group
-        _delete_dataset_group(dataset_group_arn = dataset_group_arn, wait_for_resources = wait_for_resources)
+    if len(dataset_group_names) <= 1:
+        for dataset_group_name in dataset_group_names:
+            _delete_dataset_group_and_resources(dataset_group_name, region, wait_for_resources)
+        return
+
+    # Dataset groups are independent of each other so delete them concurrently. Every
+    # worker is allowed to finish before any failure is raised so that a pending group
+    # does not stop the deletes for the other groups from being issued. Every failure is
+    # logged and a real error is raised in preference to ResourcePending so that it is
+    # not mistaken for deletes that are still in progress.
+    error_to_raise = None
+    with ThreadPoolExecutor(max_workers = len(dataset_group_names)) as executor:
+        futures = { executor.submit(_delete_dataset_group_and_resources, name, region, wait_for_resources, worker): name
+                    for worker, name in enumerate(dataset_group_names) }
+        for future in as_completed(futures):
+            error = future.exception()
+            if not error:
+                continue
+
+            if isinstance(error, ResourcePending):
+                logger.info(f'Dataset group {futures[future]} still being deleted: {error}')
+                if not error_to_raise:
+                    error_to_raise = error
+            else:
+                logger.error(f'Error deleting dataset group {futures[future]}', exc_info = error)
+                if not error_to_raise or isinstance(error_to_raise, ResourcePending):
+                    error_to_raise = error
 
-        logger.info(f'Dataset group {dataset_group_name} fully deleted')
+    if error_to_raise:
+        raise error_to_raise
 
 def _main(argv):
     region = None
@@ -828,6 +828,8 @@ def poll_delete(event, context) -> bool:
         for dataset_group_conf in dataset_group_confs:
             dataset_group_names.append(dataset_group_conf['name'])
 
+        # Issue whatever deletes can be issued now and return rather than sleeping in this
+        # function; crhelper schedules the next poll so we are not billed while deletes complete.
         delete_dataset_groups(dataset_group_names, region, wait_for_resources = False)
 
         # Clear/reset SSM params.
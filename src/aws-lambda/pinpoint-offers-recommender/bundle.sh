@@ -10,6 +10,9 @@ echo "Cleaning up intermediate files"
 
 echo "Installing Lambda dependencies"
 pip install --target ./package requests
+# orjson is a native extension so install the build for the function's runtime (python3.8
+# on x86_64) rather than for the machine running this script
+pip install --target ./package --platform manylinux2014_x86_64 --python-version 3.8 --implementation cp --only-binary=:all: orjson
 
 echo "Building Lambda deployment package"
 cd package
@@ -2,31 +2,164 @@
 # SPDX-License-Identifier: MIT-0
 
 import os
-import json
+import time
 import logging
+from collections import OrderedDict
 
-import boto3
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-pinpoint = boto3.client('pinpoint')
+# orjson for logging and parsing offers service responses, json if it will not import
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    _dumps = json.dumps
+    _loads = json.loads
+
+
+# Only needed for endpoints without an Address so created (and boto3 imported) on
+# first use, keeping boto3's import cost off cold starts that never need it
+_pinpoint = None
+
+
+def _get_pinpoint():
+    global _pinpoint
+    if _pinpoint is None:
+        import boto3
+        _pinpoint = boto3.client('pinpoint')
+    return _pinpoint
+
+
+# The offers service location does not change for the life of the container
+OFFERS_SERVICE_HOST, OFFERS_SERVICE_PORT = os.environ.get('offers_service_host'), 80
+_OFFERS_URL = f'http://{OFFERS_SERVICE_HOST}:{OFFERS_SERVICE_PORT}/offers'
+_OFFER_URL_PREFIX = _OFFERS_URL + '/'
+
+# Module level so that keep-alive connections to the offers service are reused
+# across items and across invocations of a warm Lambda container.
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=16))
+SESSION.headers.update({'Connection': 'keep-alive'})
+
+# (connect, read) timeouts so a hung offers service cannot stall the whole invocation
+OFFERS_SERVICE_TIMEOUT = (0.5, 2.0)
+
+# Offers are cached (LRU with a TTL) across invocations of a warm container since the
+# same offers are recommended to many endpoints. Only offers that were found are cached.
+OFFER_CACHE_SIZE = 1024
+OFFER_CACHE_TTL_SECONDS = 300
+_offer_cache = OrderedDict()  # offer ID -> (time cached, offer)
+
+
+def _get_cached_offer(offer_id):
+    entry = _offer_cache.get(offer_id)
+    if entry is None:
+        return None
+    cached_at, offer = entry
+    if time.monotonic() - cached_at > OFFER_CACHE_TTL_SECONDS:
+        del _offer_cache[offer_id]
+        return None
+    _offer_cache.move_to_end(offer_id)
+    return offer
+
+
+def _cache_offer(offer_id, offer):
+    _offer_cache[offer_id] = (time.monotonic(), offer)
+    _offer_cache.move_to_end(offer_id)
+    if len(_offer_cache) > OFFER_CACHE_SIZE:
+        _offer_cache.popitem(last=False)
 
 
 def get_offer_by_id(offer_id):
-    offers_service_host, offers_service_port = os.environ.get('offers_service_host'), 80
-    url = f'http://{offers_service_host}:{offers_service_port}/offers/{offer_id}'
-    logger.debug(f"Asking for offer info from {url}")
-    offers_response = requests.get(url)  # we let connection error propagate
-    logger.debug(f"Got offer info: {offers_response}")
+    offer = _get_cached_offer(offer_id)
+    if offer is not None:
+        return offer
+
+    url = _OFFER_URL_PREFIX + offer_id
+    logger.debug("Asking for offer info from %s", url)
+    # Connect and read timeouts are treated as the offer not being found so the item falls
+    # back to UNKNOWNID; other connection errors propagate
+    try:
+        offers_response = SESSION.get(url, timeout=OFFERS_SERVICE_TIMEOUT)
+    except requests.Timeout:
+        logger.warning(f"Timed out asking for offer info from {url}")
+        return None
+    logger.debug("Got offer info: %s", offers_response)
     if not offers_response.ok:
         logger.error(f"Offers service not giving us offers: {offers_response.reason}")
         return None
-    offer = offers_response.json()['task']
+    offer = _loads(offers_response.content)['task']
+    _cache_offer(offer_id, offer)
     return offer
 
 
+def get_offers_by_ids(offer_ids):
+    """ Looks up several offers in one request and returns them keyed by offer ID
+
+    Cached offers are returned without calling the offers service; only the rest are requested.
+    """
+    offers = {}
+    missing_ids = []
+    for offer_id in offer_ids:
+        offer = _get_cached_offer(offer_id)
+        if offer is not None:
+            offers[offer_id] = offer
+        else:
+            missing_ids.append(offer_id)
+
+    if not missing_ids:
+        return offers
+
+    # Pinpoint often asks for a single item; the single offer route avoids building and
+    # filtering a batch query for it
+    if len(missing_ids) == 1:
+        offer = get_offer_by_id(missing_ids[0])
+        if offer is not None:
+            offers[missing_ids[0]] = offer
+        return offers
+
+    # The offers service parses IDs as integers, so "01" and "1" are the same offer. Results
+    # are matched back through the parsed ID so they are keyed by the ID as requested.
+    requested_ids = {}  # parsed offer ID -> offer IDs as requested
+    for offer_id in missing_ids:
+        try:
+            requested_ids.setdefault(int(offer_id), []).append(offer_id)
+        except ValueError:
+            logger.warning("Offer ID %s is not an integer", offer_id)
+    if not requested_ids:
+        return offers
+
+    url = _OFFERS_URL
+    logger.debug("Asking for info for offers %s from %s", missing_ids, url)
+    # As for single offers, timeouts fall back to UNKNOWNID and other connection errors propagate
+    try:
+        offers_response = SESSION.get(url, params={'ids': ','.join(str(offer_id) for offer_id in requested_ids)},
+                                      timeout=OFFERS_SERVICE_TIMEOUT)
+    except requests.Timeout:
+        logger.warning(f"Timed out asking for info for offers {missing_ids} from {url}")
+        return offers
+    logger.debug("Got offers info: %s", offers_response)
+    if not offers_response.ok:
+        logger.error(f"Offers service not giving us offers: {offers_response.reason}")
+        return offers
+
+    for offer in _loads(offers_response.content)['tasks']:
+        for offer_id in requested_ids.get(offer['id'], ()):
+            _cache_offer(offer_id, offer)
+            offers[offer_id] = offer
+    return offers
+
+
 def lambda_handler(event, context):
     ''' Called by Amazon Pinpoint recommender to customize/enrich recommendations
 
@@ -36,51 +169,42 @@ def lambda_handler(event, context):
     function to associate more rich/useful metadata on each item using the offers service.
     '''
 
-    logger.info('ENVIRONMENT VARIABLES')
-    logger.info(os.environ)
-    logger.info('EVENT')
-    logger.info(event)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('env keys: %s', list(os.environ))
+        logger.debug('event keys: %s', list(event))
 
     new_endpoints = dict()
 
     endpoints = event.get('Endpoints')
     if endpoints:
         logger.info('endpoints')
-        for key in endpoints:
-            logger.debug('Processing Pinpoint endpoint: ' + key)
+        for key, endpoint in endpoints.items():
+            logger.debug('Processing Pinpoint endpoint: %s', key)
 
-            endpoint = endpoints.get(key)
-            logger.info(f"Processing endpoint: {json.dumps(endpoint, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Processing endpoint: %s", _dumps(endpoint))
 
             # A workaround: - if the address is not visible here it also does not find its way to Pinpoint to
             # allow sending.
             if 'Address' not in endpoint:
                 logger.warning("Address not in endpoint supplied - so we must fill it in ourselves.")
                 pinpoint_app_id = event['ApplicationId']
-                full_endpoint = pinpoint.get_endpoint(ApplicationId=pinpoint_app_id,
-                                                      EndpointId=key)
+                full_endpoint = _get_pinpoint().get_endpoint(ApplicationId=pinpoint_app_id,
+                                                             EndpointId=key)
                 endpoint['Address'] = full_endpoint['EndpointResponse']['Address']
 
             recommended_items = endpoint.get('RecommendationItems')
 
             if recommended_items:
-                recommendations = {
-                    'OfferCode': [''] * len(recommended_items),
-                    'OfferDescription': [''] * len(recommended_items)
-                }
-                for idx, item_id in enumerate(recommended_items):
-                    logger.debug('Looking up product information for item ' + item_id)
-                    offer = get_offer_by_id(item_id)
-                    if offer is not None:
-
-                        logger.info(f"Got offer: {offer}")
-                        recommendations['OfferCode'][idx] = offer['codes'][0]
-                        recommendations['OfferDescription'][idx] = offer['description']
-
-                    else:
-
-                        recommendations['OfferCode'][idx] = 'UNKNOWNID'+item_id
-                        recommendations['OfferDescription'][idx] = f'Unknown code with id {item_id}'
+                logger.debug('Looking up offer information for items %s', recommended_items)
+                offers = get_offers_by_ids(recommended_items)
+                logger.debug("Got offers: %s", offers)
+                found = [offers.get(item_id) for item_id in recommended_items]
+                codes = [offer['codes'][0] if offer is not None else 'UNKNOWNID' + item_id
+                         for offer, item_id in zip(found, recommended_items)]
+                descs = [offer['description'] if offer is not None else f'Unknown code with id {item_id}'
+                         for offer, item_id in zip(found, recommended_items)]
+                recommendations = {'OfferCode': codes, 'OfferDescription': descs}
             else:
                 logger.error('Endpoint {} does not have any RecommendationItems'.format(key))
                 recommendations = {}
@@ -91,5 +215,6 @@ def lambda_handler(event, context):
     else:
         logger.error('Event is missing Endpoints document')
 
-    logger.info("Returning endpoints: " + json.dumps(new_endpoints, indent=2))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Returning endpoints: %s", _dumps(new_endpoints))
     return new_endpoints
@@ -46,6 +46,18 @@ def index():
 
 @app.route('/offers')
 def get_offers():
+    # Optionally filter to a comma separated list of offer IDs so that clients can
+    # retrieve several offers in one request.
+    # IDs that are not integers are skipped rather than failing the whole request.
+    ids = request.args.get('ids')
+    if ids:
+        offer_ids = set()
+        for offer_id in ids.split(','):
+            try:
+                offer_ids.add(int(offer_id))
+            except ValueError:
+                pass
+        return jsonify({'tasks': [offer for offer in offers if offer['id'] in offer_ids]})
     return jsonify({'tasks': offers})
 
 
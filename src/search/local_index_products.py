@@ -11,9 +11,16 @@
 
 import os
 import sys
+import json
 import requests
 import yaml
 import logging
+from itertools import islice
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -24,6 +31,12 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 INDEX_NAME = 'products'
+BULK_BATCH_SIZE = 500
+
+PRODUCTS_FILE = '../products/src/products-service/data/products.yaml'
+# Bulk-ready copy of the catalog (an action line followed by a product line for each
+# product) generated from PRODUCTS_FILE, which remains the source of truth
+PRODUCTS_NDJSON_FILE = 'products.ndjson'
 
 # Defaults assume you're running OpenSearch locally on port 9200
 search_domain_scheme = os.environ.get('OPENSEARCH_DOMAIN_SCHEME', 'http')
@@ -35,39 +48,62 @@ logger.info('OpenSearch endpoint: ' + search_domain_host)
 logger.info('OpenSearch port: ' + str(search_domain_port))
 
 url = '{}://{}:{}/{}'.format(search_domain_scheme, search_domain_host, search_domain_port, INDEX_NAME)
+bulk_url = url + '/_bulk'
 
 headers = { "Content-Type": "application/json" }
+bulk_headers = { "Content-Type": "application/x-ndjson" }
 
-r = requests.get(url, headers = headers)
+# Reuse one keep-alive connection for all requests
+session = requests.Session()
 
+# HEAD avoids having OpenSearch serialize index metadata that we would discard.
 # If index exists, delete it so we freshly index products.
-if r.ok:
+r = session.head(url)
+if r.status_code == 200:
     logger.info('Deleting index ' + INDEX_NAME)
-    requests.delete(url)
-    r = requests.get(url, headers = headers)
-
-if r.ok:
-    logger.info('Index exists! Nothing to do.')
-else:
-    logger.info('Index does NOT exist!')
-
-    request_body = {
-        "settings" : {
-            "number_of_shards": 1,
-            "number_of_replicas": 0
-        }
-    }
-    logger.info("Creating '{}' index...".format(INDEX_NAME))
-
-    r = requests.put(url, headers = headers, json = request_body)
-    logger.info('Indexing products...')
-    products_indexed = 0
-    with open('../products/src/products-service/data/products.yaml') as file:
-        products_list = yaml.safe_load(file)
+    session.delete(url)
 
+request_body = {
+    "settings" : {
+        "number_of_shards": 1,
+        "number_of_replicas": 0
+    }
+}
+logger.info("Creating '{}' index...".format(INDEX_NAME))
+
+r = session.put(url, headers = headers, json = request_body)
+
+# Regenerate the NDJSON catalog only when the YAML catalog has changed, so repeat runs
+# stream the bulk bodies straight from disk without parsing YAML or encoding JSON.
+if not os.path.exists(PRODUCTS_NDJSON_FILE) or os.path.getmtime(PRODUCTS_NDJSON_FILE) < os.path.getmtime(PRODUCTS_FILE):
+    logger.info('Converting {} to {}...'.format(PRODUCTS_FILE, PRODUCTS_NDJSON_FILE))
+    with open(PRODUCTS_FILE) as file:
+        products_list = yaml.load(file, Loader = SafeLoader)
+    # Write to a temporary file and move it into place so an interrupted run cannot leave
+    # behind a truncated catalog that looks newer than the YAML catalog.
+    with open(PRODUCTS_NDJSON_FILE + '.tmp', 'w', encoding = 'utf-8') as file:
         for product in products_list:
-            url = '{}://{}:{}/{}/_doc/{}'.format(search_domain_scheme, search_domain_host, search_domain_port, INDEX_NAME, product['id'])
-            r = requests.put(url, headers = headers, json = product)
-            products_indexed += 1
-
-    logger.info('{} products successfully indexed!'.format(products_indexed))
+            file.write(json.dumps({ "index": { "_id": product['id'] } }) + '\n' + json.dumps(product) + '\n')
+    os.replace(PRODUCTS_NDJSON_FILE + '.tmp', PRODUCTS_NDJSON_FILE)
+
+logger.info('Indexing products...')
+products_indexed = 0
+with open(PRODUCTS_NDJSON_FILE, 'rb') as file:
+    while True:
+        body = b''.join(islice(file, BULK_BATCH_SIZE * 2))
+        if not body:
+            break
+        r = session.post(bulk_url, headers = bulk_headers, data = body)
+        if not r.ok:
+            logger.error('Bulk indexing request failed: ' + r.text)
+            continue
+
+        # Report failures per product so one bad document is as visible as it was with individual PUTs
+        for item in r.json()['items']:
+            result = item['index']
+            if 'error' in result:
+                logger.error('Failed to index product {}: {}'.format(result['_id'], result['error']))
+            else:
+                products_indexed += 1
+
+logger.info('{} products successfully indexed!'.format(products_indexed))